@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+from pathlib import Path
+
+
+class SqliteCache:
+    """Base for the small SQLite-backed caches used across the library.
+
+    Owns the connection, a lock serializing access from worker threads, and
+    WAL journaling so concurrent readers do not block the writer. Subclasses
+    declare their table in `schema` and add their own query methods, built
+    on `_execute` / `_executemany`.
+    """
+
+    schema: str
+
+    def __init__(self, path: str):
+        Path(path).expanduser().parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(Path(path).expanduser()), check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(self.schema)
+            self._conn.commit()
+
+    def _execute(self, query: str, params=()) -> list:
+        with self._lock:
+            return self._conn.execute(query, params).fetchall()
+
+    def _executemany(self, query: str, rows) -> None:
+        with self._lock:
+            self._conn.executemany(query, rows)
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import json
+
+from kotaemon._sqlite_cache import SqliteCache
+
+
+class EmbeddingCache(SqliteCache):
+    """Cache of content hash -> embedding vector.
+
+    Used during indexing to skip re-embedding chunks whose text has not
+    changed since a previous ingest (e.g. re-indexing after metadata-only
+    edits).
+    """
+
+    schema = (
+        "CREATE TABLE IF NOT EXISTS embeddings "
+        "(hash TEXT PRIMARY KEY, embedding TEXT)"
+    )
+
+    def get_many(self, hashes: list[str]) -> dict[str, list[float]]:
+        """Fetch cached embeddings for all hashes in a single query"""
+        if not hashes:
+            return {}
+        placeholders = ",".join("?" for _ in hashes)
+        rows = self._execute(
+            "SELECT hash, embedding FROM embeddings "
+            f"WHERE hash IN ({placeholders})",
+            hashes,
+        )
+        return {hash_: json.loads(embedding) for hash_, embedding in rows}
+
+    def set_many(self, embeddings_by_hash: dict[str, list[float]]):
+        """Store embeddings in a single transaction"""
+        if not embeddings_by_hash:
+            return
+        self._executemany(
+            "INSERT OR REPLACE INTO embeddings (hash, embedding) VALUES (?, ?)",
+            [
+                (hash_, json.dumps(list(embedding)))
+                for hash_, embedding in embeddings_by_hash.items()
+            ],
+        )
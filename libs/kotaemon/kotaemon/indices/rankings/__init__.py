@@ -1,11 +1,13 @@
 from .base import BaseReranking
 from .cohere import CohereReranking
+from .cross_encoder import CrossEncoderReranking
 from .llm import LLMReranking
 from .llm_scoring import LLMScoring
 from .llm_trulens import LLMTrulensScoring
 
 __all__ = [
     "CohereReranking",
+    "CrossEncoderReranking",
     "LLMReranking",
     "LLMScoring",
     "BaseReranking",
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from kotaemon._sqlite_cache import SqliteCache
+
+
+class ScoreCache(SqliteCache):
+    """Cache of rerank verdicts.
+
+    Keyed by (query hash, doc id, model name) so repeated or overlapping
+    queries skip the LLM entirely for documents scored before.
+    """
+
+    schema = (
+        "CREATE TABLE IF NOT EXISTS scores "
+        "(qhash TEXT, doc_id TEXT, model TEXT, score INT, "
+        "PRIMARY KEY (qhash, doc_id, model))"
+    )
+
+    def get_many(
+        self, qhash: str, doc_ids: list[str], model: str
+    ) -> dict[str, bool]:
+        """Fetch cached verdicts for all doc_ids in a single query"""
+        if not doc_ids:
+            return {}
+        placeholders = ",".join("?" for _ in doc_ids)
+        rows = self._execute(
+            "SELECT doc_id, score FROM scores "
+            f"WHERE qhash=? AND model=? AND doc_id IN ({placeholders})",
+            [qhash, model, *doc_ids],
+        )
+        return {doc_id: bool(score) for doc_id, score in rows}
+
+    def set_many(self, qhash: str, verdicts: dict[str, bool], model: str):
+        """Store verdicts for a query in a single transaction"""
+        if not verdicts:
+            return
+        self._executemany(
+            "INSERT OR REPLACE INTO scores (qhash, doc_id, model, score) "
+            "VALUES (?, ?, ?, ?)",
+            [
+                (qhash, doc_id, model, int(score))
+                for doc_id, score in verdicts.items()
+            ],
+        )
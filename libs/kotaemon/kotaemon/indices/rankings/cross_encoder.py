@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from kotaemon.base import Document
+
+from .base import BaseReranking
+
+
+class CrossEncoderReranking(BaseReranking):
+    """Rerank documents with a local cross-encoder model.
+
+    Runs every (query, document) pair through a small cross-encoder and keeps
+    the `top_k` highest scoring documents. Intended as a cheap pre-filter in
+    front of an expensive reranker such as `LLMReranking`: a local model scores
+    50 candidates in tens of milliseconds, so the LLM stage only sees the
+    survivors.
+    """
+
+    model_name: str = "BAAI/bge-reranker-v2-m3"
+    top_k: int = 10
+    device: str = "cpu"
+
+    def _get_model(self):
+        model = getattr(self, "_model", None)
+        if model is None:
+            try:
+                from sentence_transformers import CrossEncoder
+            except ImportError:
+                raise ImportError(
+                    "Please install sentence-transformers "
+                    "`pip install sentence-transformers` "
+                    "to use CrossEncoderReranking"
+                )
+            model = CrossEncoder(self.model_name, device=self.device)
+            self._model = model
+        return model
+
+    def run(self, documents: list[Document], query: str) -> list[Document]:
+        """Score documents against the query and keep the top_k best"""
+        # the retrieval pipeline may forward the raw query Document; the
+        # tokenizer needs plain text
+        if isinstance(query, Document):
+            query = query.text
+
+        if len(documents) <= self.top_k:
+            return documents
+
+        model = self._get_model()
+        scores = model.predict([(query, doc.get_content()) for doc in documents])
+        for doc, score in zip(documents, scores):
+            doc.metadata["reranking_score"] = float(score)
+
+        ranked = sorted(
+            documents,
+            key=lambda doc: doc.metadata["reranking_score"],
+            reverse=True,
+        )
+        return ranked[: self.top_k]
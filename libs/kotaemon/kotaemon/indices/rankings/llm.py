@@ -1,13 +1,18 @@
 from __future__ import annotations
 
 from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import logging
+import re
+import threading
+from typing import Optional
 
-from langchain.output_parsers.boolean import BooleanOutputParser
+from theflow.settings import settings as flowsettings
 
 from kotaemon.base import Document
 from kotaemon.llms import BaseLLM, PromptTemplate
 
+from ._cache import ScoreCache
 from .base import BaseReranking
 
 RERANK_PROMPT_TEMPLATE = """Given the following question and context,
@@ -19,14 +24,58 @@ return YES if the context is relevant to the question and NO if it isn't.
 {context}
 >>>
 > Relevant (YES / NO):"""
+
+BATCH_RERANK_PROMPT_TEMPLATE = """Given the following question and the numbered
+contexts below, decide for each context whether it is relevant to the question.
+Answer with exactly one line per context, in order, formatted as
+"<number>: YES" or "<number>: NO". Do not output anything else.
+
+> Question: {question}
+> Contexts:
+{contexts}
+> Answers:"""
+
+# template halves around the context, split once at import time so the
+# per-document path can build prompts by plain string concatenation
+_RERANK_PROMPT_PREFIX, _RERANK_PROMPT_SUFFIX = RERANK_PROMPT_TEMPLATE.split("{context}")
+
+# relevance verdict: any standalone "yes" in the response counts as relevant
+_YES_RE = re.compile(r"\byes\b", re.IGNORECASE)
 logger = logging.getLogger(__name__)
 
+# process-wide executor shared by all rerankers: the LLM calls are I/O bound,
+# so a single bounded pool avoids per-run thread creation and keeps the
+# concurrency against the LLM endpoint capped
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def _get_executor(max_workers: int) -> ThreadPoolExecutor:
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        with _EXECUTOR_LOCK:
+            if _EXECUTOR is None:
+                _EXECUTOR = ThreadPoolExecutor(
+                    max_workers=max_workers, thread_name_prefix="rerank"
+                )
+    return _EXECUTOR
+
 
 class LLMReranking(BaseReranking):
     llm: BaseLLM
     prompt_template: PromptTemplate = PromptTemplate(template=RERANK_PROMPT_TEMPLATE)
+    batch_prompt_template: PromptTemplate = PromptTemplate(
+        template=BATCH_RERANK_PROMPT_TEMPLATE
+    )
     top_k: int = 3
     concurrent: bool = True
+    # batch all contexts into a single LLM call when the combined prompt stays
+    # under this many characters; otherwise fall back to one call per document
+    max_batch_chars: int = 32_000
+    # path to a SQLite cache of (query, doc_id, model) -> verdict; None disables
+    cache_path: Optional[str] = getattr(flowsettings, "KH_RERANK_CACHE_PATH", None)
+    # worker count of the shared executor used for concurrent per-doc calls
+    concurrent_limit: int = 8
 
     def run(
         self,
@@ -34,39 +83,51 @@ class LLMReranking(BaseReranking):
         query: str,
     ) -> list[Document]:
         """Filter down documents based on their relevance to the query."""
-        filtered_docs = []
-        output_parser = BooleanOutputParser()
-
-        def _invoke_llm(_prompt: str):
-            try:
-                model_name = getattr(self.llm, "model", None) or getattr(self.llm, "model_name", None) or type(self.llm).__name__
-                logger.debug(f"LLMReranking invoking LLM={model_name} prompt[:160]={_prompt[:160]!r}")
-            except Exception as e:
-                logger.debug(f"LLMReranking invoking LLM; model unknown: {e}")
-            return self.llm(_prompt).text
-
-        if self.concurrent:
-            with ThreadPoolExecutor() as executor:
-                futures = []
-                for doc in documents:
-                    _prompt = self.prompt_template.populate(
-                        question=query, context=doc.get_content()
-                    )
-                    futures.append(executor.submit(_invoke_llm, _prompt))
-
-                results = [future.result() for future in futures]
-        else:
-            results = []
-            for doc in documents:
-                _prompt = self.prompt_template.populate(
-                    question=query, context=doc.get_content()
+        filtered_docs: list[Document] = []
+
+        if not documents:
+            return filtered_docs
+
+        # the retrieval pipeline may forward the raw query Document; both
+        # the prompts and the cache key need plain text
+        if isinstance(query, Document):
+            query = query.text
+
+        cache = self._get_cache()
+        verdicts: dict[int, bool] = {}
+        pending = list(range(len(documents)))
+
+        if cache is not None:
+            qhash = hashlib.sha1(query.encode("utf-8")).hexdigest()
+            cached = cache.get_many(
+                qhash, [documents[idx].doc_id for idx in pending], self._model_name()
+            )
+            for idx in pending:
+                if documents[idx].doc_id in cached:
+                    verdicts[idx] = cached[documents[idx].doc_id]
+            pending = [idx for idx in pending if idx not in verdicts]
+
+        if pending:
+            contexts = [documents[idx].get_content() for idx in pending]
+
+            results: list[bool] | None = None
+            if sum(len(context) for context in contexts) <= self.max_batch_chars:
+                results = self._rerank_batch(contexts, query)
+            if results is None:
+                results = self._rerank_per_doc(contexts, query)
+
+            for idx, verdict in zip(pending, results):
+                verdicts[idx] = verdict
+
+            if cache is not None:
+                cache.set_many(
+                    qhash,
+                    {documents[idx].doc_id: verdicts[idx] for idx in pending},
+                    self._model_name(),
                 )
-                results.append(_invoke_llm(_prompt))
 
-        # use Boolean parser to extract relevancy output from LLM
-        results = [output_parser.parse(result) for result in results]
-        for include_doc, doc in zip(results, documents):
-            if include_doc:
+        for idx, doc in enumerate(documents):
+            if verdicts[idx]:
                 filtered_docs.append(doc)
 
         # prevent returning empty result
@@ -75,3 +136,98 @@ class LLMReranking(BaseReranking):
 
         return filtered_docs
 
+    def _model_name(self) -> str:
+        return (
+            getattr(self.llm, "model", None)
+            or getattr(self.llm, "model_name", None)
+            or type(self.llm).__name__
+        )
+
+    def _get_cache(self) -> Optional[ScoreCache]:
+        if not self.cache_path:
+            return None
+        cache = getattr(self, "_score_cache", None)
+        if cache is None:
+            cache = ScoreCache(self.cache_path)
+            self._score_cache = cache
+        return cache
+
+    def _invoke_llm(self, _prompt: str) -> str:
+        try:
+            model_name = self._model_name()
+            logger.debug(f"LLMReranking invoking LLM={model_name} prompt[:160]={_prompt[:160]!r}")
+        except Exception as e:
+            logger.debug(f"LLMReranking invoking LLM; model unknown: {e}")
+        return self.llm(_prompt).text
+
+    def _rerank_batch(
+        self,
+        contexts: list[str],
+        query: str,
+    ) -> list[bool] | None:
+        """Score all contexts with a single LLM call.
+
+        The contexts are numbered and listed in one prompt; the LLM answers
+        YES/NO per number. Returns None when the response cannot be mapped
+        back to every context, so the caller can fall back to the
+        per-document path.
+        """
+        numbered = "\n".join(
+            f"[{idx}]\n{context}" for idx, context in enumerate(contexts, start=1)
+        )
+        _prompt = self.batch_prompt_template.populate(question=query, contexts=numbered)
+        response = self._invoke_llm(_prompt)
+
+        verdicts: dict[int, bool] = {}
+        try:
+            for line in response.splitlines():
+                line = line.strip()
+                if not line:
+                    continue
+                number, _, answer = line.partition(":")
+                number = number.strip().strip("[]")
+                if not number.isdigit():
+                    continue
+                verdicts[int(number)] = bool(_YES_RE.search(answer))
+        except Exception as e:
+            logger.debug(f"LLMReranking failed to parse batched response: {e}")
+            return None
+
+        if not all(idx in verdicts for idx in range(1, len(contexts) + 1)):
+            logger.debug(
+                "LLMReranking batched response did not cover all contexts, "
+                "falling back to per-document prompts"
+            )
+            return None
+
+        return [verdicts[idx] for idx in range(1, len(contexts) + 1)]
+
+    def _rerank_per_doc(
+        self,
+        contexts: list[str],
+        query: str,
+    ) -> list[bool]:
+        """Score each context with its own LLM call (fallback path)."""
+        if self.prompt_template.template == RERANK_PROMPT_TEMPLATE:
+            # the question half is identical across documents: format it once
+            # and concatenate per context, skipping template parsing per call
+            q_prefix = _RERANK_PROMPT_PREFIX.format(question=query)
+            prompts = [
+                q_prefix + context + _RERANK_PROMPT_SUFFIX for context in contexts
+            ]
+        else:
+            prompts = [
+                self.prompt_template.populate(question=query, context=context)
+                for context in contexts
+            ]
+
+        if self.concurrent:
+            # executor.map submits everything first and yields in order, so
+            # results stay aligned with the prompts
+            executor = _get_executor(self.concurrent_limit)
+            results = list(executor.map(self._invoke_llm, prompts))
+        else:
+            results = [self._invoke_llm(_prompt) for _prompt in prompts]
+
+        # extract relevancy verdict from each LLM response
+        return [bool(_YES_RE.search(result)) for result in results]
@@ -1,17 +1,25 @@
 from __future__ import annotations
 
-import threading
+import asyncio
+import hashlib
+import json
 import logging
+import os
+import threading
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional, Sequence, cast
 
+import numpy as np
 from theflow.settings import settings as flowsettings
 
-from kotaemon.base import BaseComponent, Document, RetrievedDocument
+from kotaemon.base import BaseComponent, Document, DocumentWithEmbedding, RetrievedDocument
 from kotaemon.embeddings import BaseEmbeddings
 from kotaemon.storages import BaseDocumentStore, BaseVectorStore
 
+from ._cache import EmbeddingCache
 from .base import BaseIndexing, BaseRetrieval
 from .rankings import BaseReranking, LLMReranking
 
@@ -22,6 +30,30 @@ VECTOR_STORE_FNAME = "vectorstore"
 DOC_STORE_FNAME = "docstore"
 
 
+def _retrieval_debug_enabled() -> bool:
+    """Whether per-request retrieval diagnostics are enabled"""
+    return bool(
+        os.environ.get("KH_DEBUG_RETRIEVAL")
+        or getattr(flowsettings, "KH_DEBUG_RETRIEVAL", False)
+    )
+
+
+# skip-validation constructor (pydantic v2 / v1 compatible): retrieval results
+# come from our own docstore, so re-validating every field per document is
+# pure overhead on the hot path
+_construct_retrieved = getattr(
+    RetrievedDocument, "model_construct", RetrievedDocument.construct
+)
+
+
+def _to_retrieved(doc: Document, score: float) -> RetrievedDocument:
+    """Build a RetrievedDocument from a trusted docstore document"""
+    data = doc.to_dict()
+    data.pop("class_name", None)
+    data["score"] = score
+    return _construct_retrieved(**data)
+
+
 class VectorIndexing(BaseIndexing):
     """Ingest the document, run through the embedding, and store the embedding in a
     vector store.
@@ -35,8 +67,22 @@ class VectorIndexing(BaseIndexing):
     vector_store: BaseVectorStore
     doc_store: Optional[BaseDocumentStore] = None
     embedding: BaseEmbeddings
+    # path to a SQLite cache of content hash -> embedding, so re-ingesting
+    # unchanged text skips the embedding call; None disables
+    embedding_cache_path: Optional[str] = getattr(
+        flowsettings, "KH_EMBEDDING_CACHE_PATH", None
+    )
     count_: int = 0
 
+    def _get_embedding_cache(self) -> Optional[EmbeddingCache]:
+        if not self.embedding_cache_path:
+            return None
+        cache = getattr(self, "_embedding_cache", None)
+        if cache is None:
+            cache = EmbeddingCache(self.embedding_cache_path)
+            self._embedding_cache = cache
+        return cache
+
     def to_retrieval_pipeline(self, *args, **kwargs):
         """Convert the indexing pipeline to a retrieval pipeline"""
         return VectorRetrieval(
@@ -48,37 +94,52 @@ class VectorIndexing(BaseIndexing):
 
     def write_chunk_to_file(self, docs: list[Document]):
         # save the chunks content into markdown format
-        if self.cache_dir:
-            file_name = docs[0].metadata.get("file_name")
-            if not file_name:
-                return
-
-            file_name = Path(file_name)
-            for i in range(len(docs)):
-                markdown_content = ""
-                if "page_label" in docs[i].metadata:
-                    page_label = str(docs[i].metadata["page_label"])
-                    markdown_content += f"Page label: {page_label}"
-                if "file_name" in docs[i].metadata:
-                    filename = docs[i].metadata["file_name"]
-                    markdown_content += f"\nFile name: {filename}"
-                if "section" in docs[i].metadata:
-                    section = docs[i].metadata["section"]
-                    markdown_content += f"\nSection: {section}"
-                if "type" in docs[i].metadata:
-                    if docs[i].metadata["type"] == "image":
-                        image_origin = docs[i].metadata["image_origin"]
-                        image_origin = f'<p><img src="{image_origin}"></p>'
-                        markdown_content += f"\nImage origin: {image_origin}"
-                if docs[i].text:
-                    markdown_content += f"\ntext:\n{docs[i].text}"
-
-                with open(
-                    Path(self.cache_dir) / f"{file_name.stem}_{self.count_+i}.md",
-                    "w",
-                    encoding="utf-8",
-                ) as f:
-                    f.write(markdown_content)
+        if not self.cache_dir or not docs:
+            return
+
+        file_name = docs[0].metadata.get("file_name")
+        if not file_name:
+            return
+
+        file_name = Path(file_name)
+        cache_dir = Path(self.cache_dir)
+
+        # build all contents first, then write the independent files
+        # concurrently instead of open/write/close sequentially per chunk
+        entries: list[tuple[Path, str]] = []
+        for i in range(len(docs)):
+            markdown_content = ""
+            if "page_label" in docs[i].metadata:
+                page_label = str(docs[i].metadata["page_label"])
+                markdown_content += f"Page label: {page_label}"
+            if "file_name" in docs[i].metadata:
+                filename = docs[i].metadata["file_name"]
+                markdown_content += f"\nFile name: {filename}"
+            if "section" in docs[i].metadata:
+                section = docs[i].metadata["section"]
+                markdown_content += f"\nSection: {section}"
+            if "type" in docs[i].metadata:
+                if docs[i].metadata["type"] == "image":
+                    image_origin = docs[i].metadata["image_origin"]
+                    image_origin = f'<p><img src="{image_origin}"></p>'
+                    markdown_content += f"\nImage origin: {image_origin}"
+            if docs[i].text:
+                markdown_content += f"\ntext:\n{docs[i].text}"
+
+            entries.append(
+                (cache_dir / f"{file_name.stem}_{self.count_+i}.md", markdown_content)
+            )
+
+        def write_one(path: Path, content: str):
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [
+                executor.submit(write_one, path, content) for path, content in entries
+            ]
+            for future in futures:
+                future.result()
 
     def add_to_docstore(self, docs: list[Document]):
         if self.doc_store:
@@ -87,14 +148,51 @@ class VectorIndexing(BaseIndexing):
 
     def add_to_vectorstore(self, docs: list[Document]):
         # in case we want to skip embedding
-        if self.vector_store:
+        if not self.vector_store:
+            return
+
+        cache = self._get_embedding_cache()
+        if cache is None:
             print(f"Getting embeddings for {len(docs)} nodes")
-            embeddings = self.embedding(docs)
-            print("Adding embeddings to vector store")
-            self.vector_store.add(
-                embeddings=embeddings,
-                ids=[t.doc_id for t in docs],
+            embeddings: list[DocumentWithEmbedding] = self.embedding(docs)
+        else:
+            hashes = [
+                hashlib.sha256((doc.text or "").encode("utf-8")).hexdigest()
+                for doc in docs
+            ]
+            cached = cache.get_many(hashes)
+            miss_indices = [
+                idx for idx, hash_ in enumerate(hashes) if hash_ not in cached
+            ]
+            print(
+                f"Getting embeddings for {len(miss_indices)}/{len(docs)} nodes "
+                "(rest resolved from cache)"
+            )
+            new_embeddings = (
+                self.embedding([docs[idx] for idx in miss_indices])
+                if miss_indices
+                else []
             )
+            cache.set_many(
+                {
+                    hashes[idx]: list(emb_doc.embedding)
+                    for idx, emb_doc in zip(miss_indices, new_embeddings)
+                }
+            )
+
+            embedded_by_idx = dict(zip(miss_indices, new_embeddings))
+            embeddings = [
+                embedded_by_idx[idx]
+                if idx in embedded_by_idx
+                else DocumentWithEmbedding(content=doc, embedding=cached[hash_])
+                for idx, (doc, hash_) in enumerate(zip(docs, hashes))
+            ]
+
+        print("Adding embeddings to vector store")
+        self.vector_store.add(
+            embeddings=embeddings,
+            ids=[t.doc_id for t in docs],
+        )
 
     def run(self, text: str | list[str] | Document | list[Document]):
         input_: list[Document] = []
@@ -129,6 +227,68 @@ class VectorRetrieval(BaseRetrieval):
     top_k: int = 5
     first_round_top_k_mult: int = 10
     retrieval_mode: str = "hybrid"  # vector, text, hybrid
+    # LRU size for memoized query embeddings (repeated/short interactive queries)
+    query_embedding_cache_size: int = 2048
+    # optional JSON file mapping common query prefixes to precomputed embeddings
+    prefix_cache_path: Optional[str] = getattr(
+        flowsettings, "KH_QUERY_PREFIX_CACHE_PATH", None
+    )
+
+    def _get_prefix_cache(self) -> Optional[dict]:
+        """Lazily load the persistent prefix -> embedding cache, if configured"""
+        if not self.prefix_cache_path:
+            return None
+        cache = getattr(self, "_prefix_emb_cache", None)
+        if cache is None:
+            try:
+                with open(self.prefix_cache_path, encoding="utf-8") as f:
+                    cache = {
+                        query: np.asarray(emb, dtype=np.float32)
+                        for query, emb in json.load(f).items()
+                    }
+            except Exception as e:
+                logger.warning(f"Could not load prefix cache: {e}")
+                cache = {}
+            self._prefix_emb_cache = cache
+        return cache
+
+    def _embed_query(self, text: str | Document) -> np.ndarray:
+        """Embed a query, memoizing recent queries in a bounded LRU cache
+
+        The vector is kept as a float32 numpy array instead of a Python
+        list: 4x smaller in memory and cheaper to hand across the backend
+        boundary. Repeated queries (e.g. search-as-you-type prefixes) skip
+        the embedding backend entirely. A persistent prefix cache, when
+        configured, is consulted first.
+        """
+        query = text.text if isinstance(text, Document) else text
+
+        prefix_cache = self._get_prefix_cache()
+        if prefix_cache is not None and query in prefix_cache:
+            return prefix_cache[query]
+
+        lock = getattr(self, "_query_emb_lock", None)
+        if lock is None:
+            lock = threading.Lock()
+            self._query_emb_lock = lock
+
+        with lock:
+            cache = getattr(self, "_query_emb_cache", None)
+            if cache is None:
+                cache = OrderedDict()
+                self._query_emb_cache = cache
+            if query in cache:
+                cache.move_to_end(query)
+                return cache[query]
+
+        emb = np.asarray(self.embedding(text)[0].embedding, dtype=np.float32)
+
+        with lock:
+            cache[query] = emb
+            while len(cache) > self.query_embedding_cache_size:
+                cache.popitem(last=False)
+
+        return emb
 
     def _filter_docs(
         self, documents: list[RetrievedDocument], top_k: int | None = None
@@ -137,30 +297,31 @@ class VectorRetrieval(BaseRetrieval):
             documents = documents[:top_k]
         return documents
 
-    def run(
-        self, text: str | Document, top_k: Optional[int] = None, **kwargs
-    ) -> list[RetrievedDocument]:
-        """Retrieve a list of documents from vector store
-
-        Args:
-            text: the text to retrieve similar documents
-            top_k: number of top similar documents to return
+    def _debug_backend_state(self):
+        """Introspect the configured vector store and doc store once.
 
-        Returns:
-            list[RetrievedDocument]: list of retrieved documents
+        Collection names, vector counts and sample rows require disk or RPC
+        round-trips, so this is a no-op unless KH_DEBUG_RETRIEVAL is set; the
+        derived metadata is cached on the instance so subsequent queries skip
+        the I/O even while debugging.
         """
-        if top_k is None:
-            top_k = self.top_k
+        if not _retrieval_debug_enabled():
+            return
+        if getattr(self, "_vs_meta", None) is not None:
+            return
+
+        meta: dict = {}
 
-        # DEBUG: print collection name/index coming from UI/settings and actual backend collection
         try:
             backend_collection = getattr(self.vector_store, "_collection", None)
             backend_collection_name = getattr(backend_collection, "name", None)
         except Exception:
             backend_collection_name = None
+        meta["backend_collection_name"] = backend_collection_name
 
         # Derive docstore collection/index name robustly across implementations
         docstore_collection_name = None
+        ds_path = None
         try:
             ds = self.doc_store
             if ds is not None:
@@ -177,12 +338,12 @@ class VectorRetrieval(BaseRetrieval):
                     # As a last resort, look for an underlying collection object
                     ds_collection = getattr(ds, "_collection", None)
                     docstore_collection_name = getattr(ds_collection, "name", None)
+                ds_path = getattr(ds, "db_uri", None) or getattr(ds, "_path", None)
         except Exception:
             pass
+        meta["docstore_collection_name"] = docstore_collection_name
 
-        # collection_name can be provided via UI/settings and passed through when constructing this component
         if self.collection_name or backend_collection_name or docstore_collection_name:
-            # Try to derive vector store info (path, collection)
             try:
                 vs_collection_name = (
                     getattr(self.vector_store, "_collection_name", None)
@@ -196,26 +357,16 @@ class VectorRetrieval(BaseRetrieval):
                 vs_collection_name = backend_collection_name
                 vs_path = None
 
-            # Try to derive docstore path
-            try:
-                ds = self.doc_store
-                ds_path = None
-                if ds is not None:
-                    ds_path = getattr(ds, "db_uri", None) or getattr(ds, "_path", None)
-            except Exception:
-                ds_path = None
-
-            print(
-                f"[info] Using vector store: cls={type(self.vector_store).__name__} "
+            logger.debug(
+                f"Using vector store: cls={type(self.vector_store).__name__} "
                 f"path={vs_path} (collection={vs_collection_name})"
             )
-            print(
-                f"[info] Using doc store:    cls={type(self.doc_store).__name__ if self.doc_store else None} "
+            logger.debug(
+                f"Using doc store: cls={type(self.doc_store).__name__ if self.doc_store else None} "
                 f"path={ds_path} (collection={docstore_collection_name})"
             )
-            # Keep original concise line
-            print(
-                f"[VectorRetrieval] Using collection: declared={self.collection_name} "
+            logger.debug(
+                f"Using collection: declared={self.collection_name} "
                 f"backend={backend_collection_name} "
                 f"docstore={docstore_collection_name}"
             )
@@ -226,25 +377,27 @@ class VectorRetrieval(BaseRetrieval):
 
                     _db = lancedb.connect(str(ds_path))
                     tbls = _db.table_names()
-                    print(f"[diag] LanceDB tables at {ds_path}: {tbls}")
-                    if docstore_collection_name in tbls:
-                        print(f"[diag] Docstore collection '{docstore_collection_name}' exists.")
+                    logger.debug(f"LanceDB tables at {ds_path}: {tbls}")
                     for t in tbls[:3]:
                         try:
                             table = _db.open_table(t)
                             sample = table.search().limit(1).to_list()
-                            print(f"[diag] Table '{t}' sample row: {sample[0] if sample else '<empty>'}")
+                            logger.debug(
+                                f"Table '{t}' sample row: "
+                                f"{sample[0] if sample else '<empty>'}"
+                            )
                         except Exception as e:
-                            print(f"[diag] Could not sample table '{t}': {e}")
+                            logger.debug(f"Could not sample table '{t}': {e}")
             except Exception as e:
-                print(f"[diag] Could not inspect LanceDB docstore: {e}")
+                logger.debug(f"Could not inspect LanceDB docstore: {e}")
 
-        # Optional diagnostics: attempt to count vectors in the vector store
+        # attempt to count vectors in the vector store
         try:
             cnt_fn = getattr(self.vector_store, "count", None)
             if callable(cnt_fn):
                 _vs_count = cnt_fn()
-                print(f"[diag] Vector store count: {_vs_count}")
+                meta["vector_count"] = _vs_count
+                logger.debug(f"Vector store count: {_vs_count}")
                 if _vs_count == 0:
                     # If Chroma is used and path is known, list collections for hints
                     try:
@@ -258,24 +411,99 @@ class VectorRetrieval(BaseRetrieval):
                             _client = chromadb.PersistentClient(path=str(_vs_path))
                             cols = _client.list_collections()
                             names = [getattr(c, "name", "unknown") for c in cols]
-                            print(f"[diag] Found {len(cols)} Chroma collections at path={_vs_path}: {names}")
-                            for c in cols[:5]:
-                                try:
-                                    print(f"[diag] Collection '{getattr(c, 'name', 'unknown')}' count: {c.count()}")
-                                except Exception as e:
-                                    print(f"[diag] Could not count collection '{getattr(c, 'name', 'unknown')}': {e}")
-                            # Show a quick directory listing
-                            try:
-                                from pathlib import Path as _Path
-
-                                entries = [str(p) for p in list(_Path(_vs_path).glob('*'))[:10]]
-                                print(f"[diag] Vectorstore directory entries (first 10): {entries}")
-                            except Exception as e:
-                                print(f"[diag] Could not list vectorstore directory: {e}")
+                            logger.debug(
+                                f"Found {len(cols)} Chroma collections at "
+                                f"path={_vs_path}: {names}"
+                            )
                     except Exception as e:
-                        print(f"[diag] Could not list Chroma collections: {e}")
+                        logger.debug(f"Could not list Chroma collections: {e}")
+        except Exception as e:
+            logger.debug(f"Could not count vector store: {e}")
+
+        # sample the underlying Chroma collection to record the embedding dim
+        try:
+            _collection = getattr(self.vector_store, "_collection", None)
+            if _collection is not None:
+                emb_sample = _collection.get(limit=1, include=["embeddings"])
+                _embs = emb_sample.get("embeddings", None)
+                dim = None
+                if _embs is not None:
+                    if isinstance(_embs, (list, tuple)):
+                        if len(_embs) > 0 and _embs[0] is not None:
+                            vec0 = _embs[0]
+                            dim = len(vec0) if hasattr(vec0, "__len__") else None
+                    elif hasattr(_embs, "shape"):
+                        shape = getattr(_embs, "shape", None)
+                        if shape:
+                            dim = shape[-1] if len(shape) >= 1 else None
+                meta["embedding_dim"] = dim
+                logger.debug(f"Collection embedding dimension: {dim}")
+        except Exception as e:
+            logger.debug(f"Could not determine collection embedding dimension: {e}")
+
+        self._vs_meta = meta
+
+    def _debug_query_preview(
+        self, emb, scope, do_extend, top_k_first_round, kwargs: dict
+    ):
+        """Log the query vector and kwargs about to hit the vector store"""
+        if not _retrieval_debug_enabled():
+            return
+        try:
+            logger.debug(f"Query embedding length: {len(emb)}")
+            logger.debug(f"Query embedding preview (first 8): {emb[:8]}")
+            _query_kwargs = {"top_k": top_k_first_round, "doc_ids": scope, **kwargs}
+            _safe_query_kwargs = {
+                k: v for k, v in _query_kwargs.items() if k != "embedding"
+            }
+            logger.debug(f"vector_store.query kwargs: {_safe_query_kwargs}")
+            logger.debug(
+                f"scope_len={len(scope) if scope else 0}, do_extend={do_extend}, "
+                f"top_k_first_round={top_k_first_round}"
+            )
+        except Exception:
+            pass
+
+    def _debug_result_summary(self, result: list[RetrievedDocument]):
+        """Log a per-document summary of the final result set"""
+        if not _retrieval_debug_enabled():
+            return
+        try:
+            logger.debug(f"Retrieved {len(result)} results:")
+            for i, doc in enumerate(result, 1):
+                text_val = getattr(doc, "text", None) or getattr(doc, "content", "") or ""
+                snippet = (
+                    (text_val[:280] + "...")
+                    if isinstance(text_val, str) and len(text_val) > 280
+                    else text_val
+                )
+                file_name = doc.metadata.get("file_name", "")
+                page = doc.metadata.get("page_label", "")
+                logger.debug(
+                    f"[{i}] id={doc.doc_id} score={getattr(doc, 'score', None)} "
+                    f"file_name={file_name} page={page} text={snippet!r}"
+                )
         except Exception as e:
-            print(f"[diag] Could not count vector store: {e}")
+            logger.debug(f"Could not log results summary: {e}")
+
+    def run(
+        self, text: str | Document, top_k: Optional[int] = None, **kwargs
+    ) -> list[RetrievedDocument]:
+        """Retrieve a list of documents from vector store
+
+        Args:
+            text: the text to retrieve similar documents
+            top_k: number of top similar documents to return
+
+        Returns:
+            list[RetrievedDocument]: list of retrieved documents
+        """
+        if top_k is None:
+            top_k = self.top_k
+
+        # backend introspection is expensive (disk/RPC per call), so it only
+        # runs when KH_DEBUG_RETRIEVAL is enabled and only once per instance
+        self._debug_backend_state()
 
         # Optionally disable metadata filters before querying vector store.
         # Ways to enable:
@@ -294,10 +522,12 @@ class VectorRetrieval(BaseRetrieval):
 
         if disable_filters and "filters" in kwargs:
             removed_filters = kwargs.pop("filters", None)
-            print(f"[diag] Metadata filters disabled; removed filters={removed_filters}")
+            logger.debug(f"Metadata filters disabled; removed filters={removed_filters}")
 
         do_extend = kwargs.pop("do_extend", False)
         thumbnail_count = kwargs.pop("thumbnail_count", 3)
+        # allow run_batch to reuse a vector from a single batched embedding call
+        precomputed_embedding = kwargs.pop("precomputed_embedding", None)
 
         if do_extend:
             top_k_first_round = top_k * self.first_round_top_k_mult
@@ -313,80 +543,33 @@ class VectorRetrieval(BaseRetrieval):
         result: list[RetrievedDocument] = []
         # TODO: should declare scope directly in the run params
         scope = kwargs.pop("scope", None)
-        emb: list[float]
+        # compute the query embedding once for both vector and hybrid modes;
+        # kept as a request-scoped local so concurrent runs stay thread-safe
+        emb: Optional[list[float]] = None
+        if self.retrieval_mode in ("vector", "hybrid"):
+            if precomputed_embedding is not None:
+                emb = precomputed_embedding
+            else:
+                emb = self._embed_query(text)
+            # backends truth-test the embedding (e.g. Chroma's
+            # `if not query.query_embedding`), which raises on numpy arrays:
+            # cross the store boundary as a plain list
+            emb = emb.tolist() if isinstance(emb, np.ndarray) else list(emb)
+        # documents already fetched from the docstore during retrieval, so the
+        # thumbnail stage below does not re-fetch parents it has seen
+        fetched_docs_by_id: dict[str, Document] = {}
 
         if self.retrieval_mode == "vector":
-            print(f'Creating embedding for text: {text}, top_k: {top_k_first_round}, scope: {scope}, vectorstore: {type(self.vector_store).__name__}')
             logger.info(f'Creating embedding for text: {text}, top_k: {top_k_first_round}, scope: {scope}')
-            emb = self.embedding(text)[0].embedding
-            try:
-                print(f"[diag] Query embedding length: {len(emb)}")
-                print(f"[diag] Query embedding preview (first 8): {emb[:8]}")
-            except Exception:
-                pass
-            print(f"[diag] Vector store query kwargs preview: scope_len={len(scope) if scope else 0}, do_extend={do_extend}, top_k_first_round={top_k_first_round}")
-            # Optional: introspect underlying Chroma collection
-            try:
-                _collection = getattr(self.vector_store, "_collection", None)
-                if _collection is not None:
-                    print(f"[diag] Chroma collection name: {getattr(_collection, 'name', 'unknown')}")
-                    try:
-                        print(f"[diag] Chroma collection count: {_collection.count()}")
-                    except Exception as e:
-                        print(f"[diag] Could not count via collection.count(): {e}")
-                    try:
-                        sample = _collection.get(limit=3)
-                        _ids = sample.get("ids", [])
-                        _mds = sample.get("metadatas", [])
-                        print(f"[diag] Sample ids (up to 3): {_ids}")
-                        print(f"[diag] Sample metadata (up to 3): {_mds}")
-                        try:
-                            emb_sample = _collection.get(limit=1, include=['embeddings'])
-                            _embs = emb_sample.get('embeddings', None)
-                            dim = None
-                            if _embs is not None:
-                                try:
-                                    # Case: list/tuple of vectors
-                                    if isinstance(_embs, (list, tuple)):
-                                        if len(_embs) > 0 and _embs[0] is not None:
-                                            vec0 = _embs[0]
-                                            dim = len(vec0) if hasattr(vec0, '__len__') else None
-                                    # Case: numpy array or similar (e.g., shape (1, D) or (D,))
-                                    elif hasattr(_embs, 'shape'):
-                                        shape = getattr(_embs, 'shape', None)
-                                        if shape:
-                                            dim = shape[-1] if len(shape) >= 1 else None
-                                except Exception:
-                                    dim = None
-                            if dim is not None:
-                                print(f"[diag] Collection embedding dimension: {dim}")
-                            else:
-                                print(f"[diag] Embeddings present but could not determine dimension; type={type(_embs)}")
-                        except Exception as e:
-                            print(f"[diag] Could not fetch embeddings to determine dimension: {e}")
-                    except Exception as e:
-                        print(f"[diag] Could not fetch sample from Chroma: {e}")
-                else:
-                    print("[diag] Could not access underlying Chroma collection object on vector store.")
-            except Exception as e:
-                print(f"[diag] Error introspecting Chroma collection: {e}")
-            # Print exact kwargs before querying vector store
-            try:
-                _query_kwargs = {"top_k": top_k_first_round, "doc_ids": scope, **kwargs}
-                _safe_query_kwargs = {k: v for k, v in _query_kwargs.items() if k != "embedding"}
-                print(f"[diag] vector_store.query kwargs: {_safe_query_kwargs}")
-                print(f"[diag] vector_store.query embedding_len={len(emb)}")
-            except Exception:
-                pass
+            self._debug_query_preview(emb, scope, do_extend, top_k_first_round, kwargs)
             _, scores, ids = self.vector_store.query(
                 embedding=emb, top_k=top_k_first_round, doc_ids=scope, **kwargs
             )
             docs = self.doc_store.get(ids)
+            fetched_docs_by_id.update((doc.doc_id, doc) for doc in docs)
             logger.info(f'Retrieved {len(docs)} documents from vector store')
-            print(f'Retrieved {len(docs)} documents from vector store')
             result = [
-                RetrievedDocument(**doc.to_dict(), score=score)
-                for doc, score in zip(docs, scores)
+                _to_retrieved(doc, score) for doc, score in zip(docs, scores)
             ]
         elif self.retrieval_mode == "text":
             query = text.text if isinstance(text, Document) else text
@@ -395,15 +578,10 @@ class VectorRetrieval(BaseRetrieval):
                 docs = self.doc_store.query(
                     query, top_k=top_k_first_round, doc_ids=scope
                 )
-            result = [RetrievedDocument(**doc.to_dict(), score=-1.0) for doc in docs]
+            fetched_docs_by_id.update((doc.doc_id, doc) for doc in docs)
+            result = [_to_retrieved(doc, -1.0) for doc in docs]
         elif self.retrieval_mode == "hybrid":
             # similarity search section
-            emb = self.embedding(text)[0].embedding
-            try:
-                print(f"[diag] Query embedding length: {len(emb)}")
-                print(f"[diag] Query embedding preview (first 8): {emb[:8]}")
-            except Exception:
-                pass
             vs_docs: list[RetrievedDocument] = []
             vs_ids: list[str] = []
             vs_scores: list[float] = []
@@ -414,14 +592,9 @@ class VectorRetrieval(BaseRetrieval):
                 nonlocal vs_ids
 
                 assert self.doc_store is not None
-                print(f"[diag] Vector store query kwargs preview: scope_len={len(scope) if scope else 0}, do_extend={do_extend}, top_k_first_round={top_k_first_round}")
-                try:
-                    _query_kwargs = {"top_k": top_k_first_round, "doc_ids": scope, **kwargs}
-                    _safe_query_kwargs = {k: v for k, v in _query_kwargs.items() if k != "embedding"}
-                    print(f"[diag] vector_store.query kwargs: {_safe_query_kwargs}")
-                    print(f"[diag] vector_store.query embedding_len={len(emb)}")
-                except Exception:
-                    pass
+                self._debug_query_preview(
+                    emb, scope, do_extend, top_k_first_round, kwargs
+                )
                 _, vs_scores, vs_ids = self.vector_store.query(
                     embedding=emb, top_k=top_k_first_round, doc_ids=scope, **kwargs
                 )
@@ -441,29 +614,145 @@ class VectorRetrieval(BaseRetrieval):
                         query, top_k=top_k_first_round, doc_ids=scope
                     )
 
-            vs_query_thread = threading.Thread(target=query_vectorstore)
-            ds_query_thread = threading.Thread(target=query_docstore)
+            # submit both queries first, then collect, so they overlap and
+            # any backend exception propagates instead of being swallowed
+            # inside a bare thread
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                vs_query_future = executor.submit(query_vectorstore)
+                ds_query_future = executor.submit(query_docstore)
 
-            vs_query_thread.start()
-            ds_query_thread.start()
+                vs_query_future.result()
+                ds_query_future.result()
 
-            vs_query_thread.join()
-            ds_query_thread.join()
+            fetched_docs_by_id.update((doc.doc_id, doc) for doc in vs_docs)
+            fetched_docs_by_id.update((doc.doc_id, doc) for doc in ds_docs)
 
+            # dedup by doc id against the vector-store hits; the set makes
+            # this O(N+M) instead of scanning the id list per document
+            vs_id_set = set(vs_ids)
             result = [
-                RetrievedDocument(**doc.to_dict(), score=-1.0)
+                _to_retrieved(doc, -1.0)
                 for doc in ds_docs
-                if doc not in vs_ids
+                if doc.doc_id not in vs_id_set
             ]
             result += [
-                RetrievedDocument(**doc.to_dict(), score=score)
-                for doc, score in zip(vs_docs, vs_scores)
+                _to_retrieved(doc, score) for doc, score in zip(vs_docs, vs_scores)
             ]
-            print(f"Got {len(vs_docs)} from vectorstore")
-            print(f"Got {len(ds_docs)} from docstore")
+            logger.debug(f"Got {len(vs_docs)} from vectorstore")
+            logger.debug(f"Got {len(ds_docs)} from docstore")
+
+        return self._postprocess_results(
+            result, text, top_k, thumbnail_count, fetched_docs_by_id
+        )
+
+    async def arun(
+        self, text: str | Document, top_k: Optional[int] = None, **kwargs
+    ) -> list[RetrievedDocument]:
+        """Async version of run
+
+        In hybrid mode, when both stores expose native async query methods
+        (feature-detected via `aquery`), the vector-store and docstore
+        queries are awaited together with `asyncio.gather` instead of
+        spawning worker threads. Otherwise the sync path runs in a worker
+        thread so the event loop is never blocked.
+
+        Args:
+            text: the text to retrieve similar documents
+            top_k: number of top similar documents to return
+
+        Returns:
+            list[RetrievedDocument]: list of retrieved documents
+        """
+        if not (
+            self.retrieval_mode == "hybrid"
+            and hasattr(self.vector_store, "aquery")
+            and self.doc_store is not None
+            and hasattr(self.doc_store, "aquery")
+        ):
+            return await asyncio.to_thread(self.run, text, top_k=top_k, **kwargs)
 
-        # use additional reranker to re-order the document list
-        if self.rerankers and text:
+        if top_k is None:
+            top_k = self.top_k
+
+        do_extend = kwargs.pop("do_extend", False)
+        thumbnail_count = kwargs.pop("thumbnail_count", 3)
+        precomputed_embedding = kwargs.pop("precomputed_embedding", None)
+        scope = kwargs.pop("scope", None)
+
+        if do_extend:
+            top_k_first_round = top_k * self.first_round_top_k_mult
+        else:
+            top_k_first_round = top_k
+
+        if precomputed_embedding is not None:
+            emb = precomputed_embedding
+        else:
+            emb = self._embed_query(text)
+        # as in run: backends truth-test the embedding, so pass a plain list
+        emb = emb.tolist() if isinstance(emb, np.ndarray) else list(emb)
+        query = text.text if isinstance(text, Document) else text
+
+        async def query_vectorstore():
+            assert self.doc_store is not None
+            _, scores, ids = await self.vector_store.aquery(  # type: ignore[attr-defined]
+                embedding=emb, top_k=top_k_first_round, doc_ids=scope, **kwargs
+            )
+            docs = self.doc_store.get(ids) if ids else []
+            return docs, scores, ids
+
+        async def query_docstore():
+            assert self.doc_store is not None
+            if not scope:
+                return []
+            return await self.doc_store.aquery(  # type: ignore[attr-defined]
+                query, top_k=top_k_first_round, doc_ids=scope
+            )
+
+        (vs_docs, vs_scores, vs_ids), ds_docs = await asyncio.gather(
+            query_vectorstore(), query_docstore()
+        )
+
+        fetched_docs_by_id: dict[str, Document] = {}
+        fetched_docs_by_id.update((doc.doc_id, doc) for doc in vs_docs)
+        fetched_docs_by_id.update((doc.doc_id, doc) for doc in ds_docs)
+
+        vs_id_set = set(vs_ids)
+        result = [
+            _to_retrieved(doc, -1.0)
+            for doc in ds_docs
+            if doc.doc_id not in vs_id_set
+        ]
+        result += [
+            _to_retrieved(doc, score) for doc, score in zip(vs_docs, vs_scores)
+        ]
+
+        return self._postprocess_results(
+            result, text, top_k, thumbnail_count, fetched_docs_by_id
+        )
+
+    def _postprocess_results(
+        self,
+        result: list[RetrievedDocument],
+        text: str | Document,
+        top_k: int,
+        thumbnail_count: int,
+        fetched_docs_by_id: dict[str, Document],
+    ) -> list[RetrievedDocument]:
+        """Rerank the retrieved documents and attach page thumbnails
+
+        Shared by the sync and async retrieval paths.
+        """
+        assert self.doc_store is not None
+
+        # nothing retrieved (e.g. over-restrictive filters): skip the reranker
+        # and thumbnail machinery entirely
+        if not result:
+            return []
+
+        # use additional reranker to re-order the document list; rerankers
+        # cascade in order, so a cheap local stage (e.g. CrossEncoderReranking)
+        # placed before LLMReranking trims the candidate set the LLM sees
+        if self.rerankers and text and result:
             for reranker in self.rerankers:
                 # if reranker is LLMReranking, limit the document with top_k items only
                 if isinstance(reranker, LLMReranking):
@@ -471,7 +760,7 @@ class VectorRetrieval(BaseRetrieval):
                 result = reranker.run(documents=result, query=text)
 
         result = self._filter_docs(result, top_k=top_k)
-        print(f"Got raw {len(result)} retrieved documents")
+        logger.debug(f"Got raw {len(result)} retrieved documents")
 
         # add page thumbnails to the result if exists
         thumbnail_doc_ids: set[str] = set()
@@ -497,53 +786,85 @@ class VectorRetrieval(BaseRetrieval):
             else:
                 non_thumbnail_docs.append(doc)
 
-        linked_thumbnail_docs = self.doc_store.get(list(thumbnail_doc_ids))
-        print(
-            "thumbnail docs",
-            len(linked_thumbnail_docs),
-            "non-thumbnail docs",
-            len(non_thumbnail_docs),
-            "raw-thumbnail docs",
-            len(raw_thumbnail_docs),
-        )
-        additional_docs = []
+        # fetch only the thumbnail parents not already retrieved above, in a
+        # single docstore call
+        missing_thumbnail_ids = [
+            doc_id for doc_id in thumbnail_doc_ids if doc_id not in fetched_docs_by_id
+        ]
+        if missing_thumbnail_ids:
+            fetched_docs_by_id.update(
+                (doc.doc_id, doc) for doc in self.doc_store.get(missing_thumbnail_ids)
+            )
 
-        for thumbnail_doc in linked_thumbnail_docs:
-            text_doc = text_thumbnail_docs[thumbnail_doc.doc_id]
+        # single pass over the text chunks with dict lookups into the fetched
+        # thumbnails; metadata is merged in one dict expression (thumbnail
+        # keys win, missing keys come from the text chunk)
+        additional_docs = []
+        for thumbnail_id, text_doc in text_thumbnail_docs.items():
+            thumbnail_doc = fetched_docs_by_id.get(thumbnail_id)
+            if thumbnail_doc is None:
+                continue
             doc_dict = thumbnail_doc.to_dict()
             doc_dict["_id"] = text_doc.doc_id
             doc_dict["content"] = text_doc.content
-            doc_dict["metadata"]["type"] = "image"
-            for key in text_doc.metadata:
-                if key not in doc_dict["metadata"]:
-                    doc_dict["metadata"][key] = text_doc.metadata[key]
-
+            doc_dict["metadata"] = {
+                **text_doc.metadata,
+                **doc_dict["metadata"],
+                "type": "image",
+            }
             additional_docs.append(RetrievedDocument(**doc_dict, score=text_doc.score))
 
+        logger.debug(
+            f"thumbnail docs {len(additional_docs)} "
+            f"non-thumbnail docs {len(non_thumbnail_docs)} "
+            f"raw-thumbnail docs {len(raw_thumbnail_docs)}"
+        )
+
         result = additional_docs + non_thumbnail_docs
 
         if not result:
             # return output from raw retrieved thumbnails
             result = self._filter_docs(raw_thumbnail_docs, top_k=thumbnail_count)
 
-        try:
-            print(f"[result] Retrieved {len(result)} results:")
-            for i, doc in enumerate(result, 1):
-                try:
-                    text_val = getattr(doc, "text", None) or getattr(doc, "content", "") or ""
-                except Exception:
-                    text_val = ""
-                snippet = (text_val[:280] + "...") if isinstance(text_val, str) and len(text_val) > 280 else text_val
-                file_name = doc.metadata.get("file_name", "")
-                page = doc.metadata.get("page_label", "")
-                print("-" * 80)
-                print(f"[{i}] id={doc.doc_id} score={getattr(doc, 'score', None)} file_name={file_name} page={page}")
-                print(snippet)
-        except Exception as e:
-            print(f"[diag] Could not print results summary: {e}")
+        self._debug_result_summary(result)
 
         return result
 
+    def run_batch(
+        self,
+        texts: list[str] | list[Document],
+        top_k: Optional[int] = None,
+        **kwargs,
+    ) -> list[list[RetrievedDocument]]:
+        """Retrieve documents for multiple queries with one batched embedding call
+
+        All queries are embedded in a single `embedding()` invocation to
+        exploit the backend's batch dimension, then each query runs through
+        the normal retrieval path with its precomputed vector.
+
+        Args:
+            texts: the texts to retrieve similar documents for
+            top_k: number of top similar documents to return per query
+
+        Returns:
+            list[list[RetrievedDocument]]: retrieved documents per query
+        """
+        if not texts:
+            return []
+
+        if self.retrieval_mode in ("vector", "hybrid"):
+            embeddings = [
+                np.asarray(doc.embedding, dtype=np.float32).tolist()
+                for doc in self.embedding(list(texts))
+            ]
+        else:
+            embeddings = [None] * len(texts)
+
+        return [
+            self.run(text, top_k=top_k, precomputed_embedding=emb, **kwargs)
+            for text, emb in zip(texts, embeddings)
+        ]
+
 
 class TextVectorQA(BaseComponent):
     retrieving_pipeline: BaseRetrieval
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from kotaemon._sqlite_cache import SqliteCache
+
+
+class VisionCache(SqliteCache):
+    """Cache of image content hash -> vision description.
+
+    Re-ingesting the same PDF, or meeting the same logo/template image
+    across many PDFs, resolves from the cache instead of paying for a
+    fresh Vision API call.
+    """
+
+    schema = (
+        "CREATE TABLE IF NOT EXISTS descriptions "
+        "(key TEXT PRIMARY KEY, description TEXT)"
+    )
+
+    def get(self, key: str) -> Optional[str]:
+        rows = self._execute(
+            "SELECT description FROM descriptions WHERE key=?", (key,)
+        )
+        return rows[0][0] if rows else None
+
+    def set(self, key: str, description: str):
+        self._executemany(
+            "INSERT OR REPLACE INTO descriptions (key, description) "
+            "VALUES (?, ?)",
+            [(key, description)],
+        )
@@ -1,9 +1,18 @@
-import base64
+try:
+    # SIMD-accelerated drop-in replacement for the scalar stdlib codec;
+    # matters for the multi-hundred-KB base64 payloads built here
+    import pybase64 as base64
+except ImportError:
+    import base64
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from io import BytesIO
+from itertools import repeat
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 import logging
 
+import numpy as np
 from decouple import config
 from fsspec import AbstractFileSystem
 from llama_index.readers.file import PDFReader
@@ -11,45 +20,170 @@ from PIL import Image
 
 from kotaemon.base import Document
 from kotaemon.loaders.openai_vision_image_reader import OpenAIVisionImageReader
-import tempfile
-import os
+
+logger = logging.getLogger(__name__)
 
 PDF_LOADER_DPI = config("PDF_LOADER_DPI", default=40, cast=int)
+# number of OpenAI Vision calls kept in flight at once; the calls are
+# network-bound, so threads give near-linear speedup up to this limit
+VISION_CONCURRENCY = config("VISION_CONCURRENCY", default=8, cast=int)
+# how many images to combine into a single vision request; batching
+# amortizes the HTTP and prompt-prefill overhead across the batch
+VISION_BATCH_SIZE = config("VISION_BATCH_SIZE", default=4, cast=int)
+# emit a thumbnail document for every page; disable to rasterize only the
+# pages that actually have vision-worthy content, which skips most
+# get_pixmap calls on text-heavy PDFs
+EMIT_ALL_THUMBNAILS = config("EMIT_ALL_THUMBNAILS", default=True, cast=bool)
+# minimum grey-level standard deviation a rendered page must show before
+# it is worth a vision call; near-blank and pure-text pages score lower
+VISION_MIN_PIXEL_STD = config("VISION_MIN_PIXEL_STD", default=15.0, cast=float)
+
+# image formats the vision API accepts as-is; anything else must be
+# re-encoded before upload
+_VISION_SUPPORTED = {"png", "jpg", "jpeg", "gif", "webp"}
 
 
 def get_page_thumbnails(
-    file_path: Path, pages: list[int], dpi: int = PDF_LOADER_DPI
-) -> List[Image.Image]:
+    file_path: Path,
+    pages: list[int],
+    dpi: int = PDF_LOADER_DPI,
+    doc=None,
+    with_scores: bool = False,
+) -> List[str] | List[tuple[str, float]]:
     """Get image thumbnails of the pages in the PDF file.
 
     Args:
         file_path (Path): path to the image file
         page_number (list[int]): list of page numbers to extract
+        doc: an already-open fitz Document for file_path, reused on the
+            sequential path instead of parsing the PDF a second time
+        with_scores: also return each page's grey-level standard
+            deviation, a cheap proxy for visual richness
 
     Returns:
-        list[Image.Image]: list of page thumbnails
+        list[str]: list of page thumbnails as base64 data URLs, or
+            (data URL, score) tuples when with_scores is set
     """
 
-    img: Image.Image
     suffix = file_path.suffix.lower()
     assert suffix == ".pdf", "This function only supports PDF files."
     try:
-        import fitz
+        import fitz  # noqa: F401
     except ImportError:
         raise ImportError("Please install PyMuPDF: 'pip install PyMuPDF'")
 
+    # rasterization + PNG encode is CPU-bound, so spread the pages over a
+    # small process pool; each worker opens its own handle because fitz
+    # Documents cannot be shared across processes
+    num_workers = min(os.cpu_count() or 1, 4)
+    if num_workers <= 1 or len(pages) <= num_workers:
+        if doc is not None:
+            rendered = _render_from_doc(doc, list(pages), dpi)
+        else:
+            rendered = _render_pages(str(file_path), list(pages), dpi)
+    else:
+        chunk_size = -(-len(pages) // num_workers)
+        groups = [pages[i : i + chunk_size] for i in range(0, len(pages), chunk_size)]
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            results = executor.map(
+                _render_pages, repeat(str(file_path)), groups, repeat(dpi)
+            )
+        # groups are contiguous slices and map yields them in order, so
+        # concatenating preserves the original page order
+        rendered = [entry for group in results for entry in group]
+
+    if with_scores:
+        return rendered
+    return [thumbnail for thumbnail, _ in rendered]
+
+
+def _render_pages(
+    file_path: str, page_indices: list[int], dpi: int
+) -> list[tuple[str, float]]:
+    """Render the given pages to base64 PNG data URLs.
+
+    Top-level so it is picklable for the process pool; workers open their
+    own handle since fitz Documents cannot cross process boundaries.
+    """
+    import fitz
+
     doc = fitz.open(file_path)
+    try:
+        return _render_from_doc(doc, page_indices, dpi)
+    finally:
+        doc.close()
 
+
+def _render_from_doc(doc, page_indices: list[int], dpi: int) -> list[tuple[str, float]]:
     output_imgs = []
-    for page_number in pages:
+    for page_number in page_indices:
         page = doc.load_page(page_number)
         pm = page.get_pixmap(dpi=dpi, alpha=False)  # Ensure no alpha channel
-        img = Image.frombytes("RGB", [pm.width, pm.height], pm.samples)
-        output_imgs.append(convert_image_to_base64(img))
-
+        # let fitz encode the PNG directly instead of round-tripping the
+        # raw RGB samples through a PIL Image and its own PNG encoder
+        png_bytes = pm.tobytes("png")
+        # score visual richness while the raw samples are still in memory:
+        # the grey-level spread of a downsampled frame separates diagrams
+        # and photos from near-blank or pure-text pages
+        arr = np.frombuffer(pm.samples, dtype=np.uint8).reshape(
+            pm.height, pm.width, pm.n
+        )
+        grey = arr[::8, ::8].mean(axis=-1)
+        output_imgs.append(
+            (
+                "data:image/png;base64," + base64.b64encode(png_bytes).decode("ascii"),
+                float(grey.std()),
+            )
+        )
     return output_imgs
 
 
+def _filter_int_label_docs(
+    documents: List[Document],
+) -> tuple[List[Document], List[str], List[int]]:
+    """Keep documents whose page_label parses as an integer.
+
+    Non-integer labels (cover pages, roman-numeral front matter) are
+    dropped, and each kept document comes with its physical position among
+    all labeled pages, so rendering and page walks target the right pages
+    even when front matter shifts the numbering.
+    """
+    filtered_docs: List[Document] = []
+    page_numbers_str: List[str] = []
+    page_indices: List[int] = []
+    labeled_count = 0
+    for doc in documents:
+        if "page_label" not in doc.metadata:
+            continue
+        page_num_str = doc.metadata["page_label"]
+        physical_idx = labeled_count
+        labeled_count += 1
+        try:
+            int(page_num_str)
+        except ValueError:
+            continue
+        filtered_docs.append(doc)
+        page_numbers_str.append(page_num_str)
+        page_indices.append(physical_idx)
+    return filtered_docs, page_numbers_str, page_indices
+
+
+def _has_vision_targets(page) -> bool:
+    """Cheap check whether a page holds content worth sending to vision.
+
+    Uses only page metadata (drawing count and the image list, whose tuples
+    already carry width/height/smask) so no image bytes are decoded.
+    """
+    drawings = page.get_drawings()
+    if drawings and len(drawings) > 100:
+        return True
+    for img in page.get_images(full=True):
+        smask, width, height = img[1], img[2], img[3]
+        if smask == 0 and width >= 200 and height >= 200:
+            return True
+    return False
+
+
 def convert_image_to_base64(img: Image.Image) -> str:
     # convert the image into base64
     img_bytes = BytesIO()
@@ -76,32 +210,35 @@ class PDFThumbnailReader(PDFReader):
         fs: Optional[AbstractFileSystem] = None,
     ) -> List[Document]:
         """Parse file."""
+        return list(self.iter_data(file, extra_info, fs))
+
+    def iter_data(
+        self,
+        file: Path,
+        extra_info: Optional[Dict] = None,
+        fs: Optional[AbstractFileSystem] = None,
+    ):
+        """Parse file, yielding documents as they become available.
+
+        Streaming consumers can drop each document after use instead of
+        holding every description and base64 thumbnail at once.
+        """
         documents = super().load_data(file, extra_info, fs)
+        yield from self._iter_page_documents(file, documents, extra_info)
+
+    def _iter_page_documents(
+        self,
+        file: Path,
+        documents: List[Document],
+        extra_info: Optional[Dict],
+    ):
+        documents, page_numbers_str, page_numbers = _filter_int_label_docs(
+            documents
+        )
 
-        page_numbers_str = []
-        filtered_docs = []
-        is_int_page_number: dict[str, bool] = {}
-
-        for doc in documents:
-            if "page_label" in doc.metadata:
-                page_num_str = doc.metadata["page_label"]
-                page_numbers_str.append(page_num_str)
-                try:
-                    _ = int(page_num_str)
-                    is_int_page_number[page_num_str] = True
-                    filtered_docs.append(doc)
-                except ValueError:
-                    is_int_page_number[page_num_str] = False
-                    continue
-
-        documents = filtered_docs
-        page_numbers = list(range(len(page_numbers_str)))
-
-        logging.basicConfig(level=logging.INFO)
-        logger = logging.getLogger(__name__)
         logger.info(f"Page numbers: {len(page_numbers)}")
-        logger.info(f"page_numbers: {page_numbers}")
-        logger.info(f"page_numbers_str: {page_numbers_str}")
+        logger.debug(f"page_numbers: {page_numbers}")
+        logger.debug(f"page_numbers_str: {page_numbers_str}")
         # Only use OpenAI Vision for actual images in the PDF, not for text-only pages
         vision_reader = OpenAIVisionImageReader()
         try:
@@ -109,33 +246,143 @@ class PDFThumbnailReader(PDFReader):
         except ImportError:
             raise ImportError("Please install PyMuPDF: 'pip install PyMuPDF'")
 
-        # Generate page-level thumbnails for all pages
-        page_thumbnails = get_page_thumbnails(file, page_numbers)
-        logger.info(f"Number of page_thumbnails: {len(page_thumbnails)}")
-
+        # Open the PDF once and share the handle between thumbnail
+        # rendering and the page walk below
         pdf_doc = fitz.open(file)
-        for idx, page_number in enumerate(page_numbers):
-            page = pdf_doc.load_page(page_number)
-            images = page.get_images(full=True)
-            page_thumbnail_b64 = page_thumbnails[idx] if idx < len(page_thumbnails) else None
-
-            # Always check for vector drawings (diagrams, flowcharts, etc.)
-            drawings = page.get_drawings()
-            if drawings and page_thumbnail_b64 and len(drawings) > 100:
-                logger.info(f'Extracting diagram/flowchart description for page {page_number}...')
-                # Save thumbnail to temp file
-                img_data = page_thumbnail_b64.split(",")[1]
-                img_bytes = base64.b64decode(img_data)
-                with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp_img:
-                    tmp_img.write(img_bytes)
-                    tmp_img_path = tmp_img.name
-                try:
-                    vision_docs = vision_reader.load_data(Path(tmp_img_path))
-                    description = vision_docs[0].text if vision_docs else ""
-                except Exception:
-                    description = ""
-                finally:
-                    os.remove(tmp_img_path)
+        try:
+            # Decide which pages need rasterizing before paying for it
+            if EMIT_ALL_THUMBNAILS:
+                pages_to_render = page_numbers
+            else:
+                pages_to_render = [
+                    number
+                    for number in page_numbers
+                    if _has_vision_targets(pdf_doc.load_page(number))
+                ]
+            rendered = get_page_thumbnails(
+                file, pages_to_render, doc=pdf_doc, with_scores=True
+            )
+            thumbnail_by_page = dict(zip(pages_to_render, rendered))
+            entries = [thumbnail_by_page.get(number) for number in page_numbers]
+            page_thumbnails = [entry[0] if entry else None for entry in entries]
+            thumbnail_scores = [entry[1] if entry else 0.0 for entry in entries]
+            logger.info(f"Number of page_thumbnails: {len(rendered)}")
+
+            # First pass: walk the pages and collect every vision-worthy
+            # target without doing any network I/O. The same xref (logos,
+            # repeated figures) is described once and reused everywhere.
+            tasks: list[Dict[str, Any]] = []
+            seen_xrefs: dict[int, int] = {}  # xref -> task index, -1 if rejected
+            for idx, page_number in enumerate(page_numbers):
+                page = pdf_doc.load_page(page_number)
+                images = page.get_images(full=True)
+                page_thumbnail_b64 = page_thumbnails[idx] if idx < len(page_thumbnails) else None
+
+                # Always check for vector drawings (diagrams, flowcharts, etc.)
+                drawings = page.get_drawings()
+                # skip the vision call when the render is near-blank or pure
+                # text (low grey-level spread): vision adds nothing there
+                if (
+                    drawings
+                    and page_thumbnail_b64
+                    and len(drawings) > 100
+                    and thumbnail_scores[idx] >= VISION_MIN_PIXEL_STD
+                ):
+                    logger.info(f'Extracting diagram/flowchart description for page {page_number}...')
+                    # the thumbnail is already a base64 data URL: reuse it as-is
+                    tasks.append(
+                        {"idx": idx, "kind": "diagram", "data_url": page_thumbnail_b64}
+                    )
+
+                for img_index, img in enumerate(images):
+                    xref = img[0]
+                    if xref in seen_xrefs:
+                        if seen_xrefs[xref] >= 0:
+                            # already queued: reuse its description, skipping
+                            # both the image decode and the vision call
+                            tasks.append(
+                                {
+                                    "idx": idx,
+                                    "kind": "image",
+                                    "ref_task": seen_xrefs[xref],
+                                    "img_index": img_index,
+                                }
+                            )
+                        continue
+                    base_image = pdf_doc.extract_image(xref)
+                    width = base_image.get("width")
+                    height = base_image.get("height")
+                    smask = base_image.get("smask")
+                    img_ext = base_image["ext"]
+                    img_bytes = base_image["image"]
+                    # Only process if not soft-masked and has reasonable size;
+                    # extract_image reports smask as an xref int, 0 when the
+                    # image has no mask (matching _has_vision_targets)
+                    if smask or not width or not height or width < 200 or height < 200:
+                        seen_xrefs[xref] = -1
+                        continue  # Skip soft masks, small, or invalid images
+                    if img_ext not in _VISION_SUPPORTED:
+                        # exotic codecs (jp2, jbig2, ...) would be sent as
+                        # unsupported bytes: decode once and re-encode as JPEG
+                        try:
+                            img = Image.open(BytesIO(img_bytes))
+                            buf = BytesIO()
+                            img.convert("RGB").save(buf, "JPEG", quality=85)
+                            img_bytes = buf.getvalue()
+                            img_ext = "jpeg"
+                        except Exception:
+                            seen_xrefs[xref] = -1
+                            continue  # Undecodable image: nothing to describe
+                    # Encode once via the reader so its resolution cap
+                    # applies; the same data URL is sent to the vision API
+                    img_base64 = vision_reader.encode_data_url(img_bytes, img_ext)
+                    logger.info(f'Extracting image description for page {page_number}, image {img_index}...')
+                    seen_xrefs[xref] = len(tasks)
+                    tasks.append(
+                        {
+                            "idx": idx,
+                            "kind": "image",
+                            "data_url": img_base64,
+                            "img_index": img_index,
+                        }
+                    )
+        finally:
+            pdf_doc.close()
+
+        # Second pass: group the tasks into small batches and dispatch the
+        # batched vision calls concurrently; executor.map yields in
+        # submission order so the results stay aligned with tasks
+        def describe_batch(batch: list[Dict[str, Any]]) -> list[str]:
+            try:
+                return vision_reader.describe_batch(
+                    [task["data_url"] for task in batch]
+                )
+            except Exception:
+                return ["" for _ in batch]
+
+        call_tasks = [task for task in tasks if "data_url" in task]
+        if call_tasks:
+            batch_size = max(VISION_BATCH_SIZE, 1)
+            batches = [
+                call_tasks[i : i + batch_size]
+                for i in range(0, len(call_tasks), batch_size)
+            ]
+            descriptions: list[str] = []
+            with ThreadPoolExecutor(max_workers=VISION_CONCURRENCY) as executor:
+                for batch_descriptions in executor.map(describe_batch, batches):
+                    descriptions.extend(batch_descriptions)
+            for task, description in zip(call_tasks, descriptions):
+                task["description"] = description
+
+        # Final pass: merge the descriptions back into the page documents in
+        # deterministic (task submission) order
+        for task in tasks:
+            if "ref_task" in task:
+                description = tasks[task["ref_task"]].get("description", "")
+            else:
+                description = task.get("description", "")
+            idx = task["idx"]
+            if task["kind"] == "diagram":
                 # Append vision description to the existing document for this page
                 if idx < len(documents):
                     doc = documents[idx]
@@ -154,32 +401,8 @@ class PDFThumbnailReader(PDFReader):
                             },
                         )
                     )
-
-            for img_index, img in enumerate(images):
-                xref = img[0]
-                base_image = pdf_doc.extract_image(xref)
-                width = base_image.get("width")
-                height = base_image.get("height")
-                smask = base_image.get("smask")
-                img_ext = base_image["ext"]
-                img_bytes = base_image["image"]
-                # Only process if not a soft mask and has reasonable size
-                if smask is not None or not width or not height or width < 200 or height < 200:
-                    continue  # Skip soft masks, small, or invalid images
-                # Save image to temp file
-                with tempfile.NamedTemporaryFile(suffix=f".{img_ext}", delete=False) as tmp_img:
-                    tmp_img.write(img_bytes)
-                    tmp_img_path = tmp_img.name
-                # Convert to base64 for metadata
-                img_base64 = f"data:image/{img_ext};base64," + base64.b64encode(img_bytes).decode("utf-8")
-                logger.info(f'Extracting image description for page {page_number}, image {img_index}...')
-                try:
-                    vision_docs = vision_reader.load_data(Path(tmp_img_path))
-                    description = vision_docs[0].text if vision_docs else ""
-                except Exception:
-                    description = ""
-                finally:
-                    os.remove(tmp_img_path)
+            else:
+                img_index = task["img_index"]
                 # Append vision description to the existing document for this page
                 if idx < len(documents):
                     doc = documents[idx]
@@ -203,24 +426,18 @@ class PDFThumbnailReader(PDFReader):
                             },
                         )
                     )
-        documents.extend(
-            [ 
-                Document(
-                    text="Page thumbnail",
-                    metadata={
-                        "image_origin": page_thumbnail,
-                        "type": "thumbnail",
-                        "page_label": page_number,
-                        **(extra_info if extra_info is not None else {}),
-                    },
-                )
-                for (page_thumbnail, page_number) in zip(
-                    page_thumbnails, page_numbers_str
-                )
-                if is_int_page_number[page_number]
-            ]
-        )
-
-
-        return documents
+        yield from documents
 
+        # thumbnail documents are constructed lazily, one per yield
+        for page_thumbnail, page_number in zip(page_thumbnails, page_numbers_str):
+            if page_thumbnail is None:
+                continue
+            yield Document(
+                text="Page thumbnail",
+                metadata={
+                    "image_origin": page_thumbnail,
+                    "type": "thumbnail",
+                    "page_label": page_number,
+                    **(extra_info if extra_info is not None else {}),
+                },
+            )
@@ -93,3 +93,21 @@ def test_azureai_document_intelligence_reader(mock_client):
 
     assert len(docs) == 1
     mock_client.assert_called_once()
+
+
+def test_filter_int_label_docs():
+    from kotaemon.loaders.pdf_loader import _filter_int_label_docs
+
+    documents = [
+        Document(text="cover", metadata={"page_label": "i"}),
+        Document(text="page 1", metadata={"page_label": "1"}),
+        Document(text="no label", metadata={}),
+        Document(text="page 2", metadata={"page_label": "2"}),
+    ]
+    filtered_docs, labels, page_indices = _filter_int_label_docs(documents)
+
+    assert labels == ["1", "2"]
+    assert [doc.text for doc in filtered_docs] == ["page 1", "page 2"]
+    # physical positions among labeled pages: the roman-numeral cover page
+    # occupies index 0, so the kept pages sit at 1 and 2
+    assert page_indices == [1, 2]
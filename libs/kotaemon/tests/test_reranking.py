@@ -7,8 +7,9 @@ from kotaemon.base import Document
 from kotaemon.indices.rankings import LLMReranking
 from kotaemon.llms import AzureChatOpenAI
 
-_openai_chat_completion_responses = [
-    ChatCompletion.parse_obj(
+
+def _make_completion(text: str) -> ChatCompletion:
+    return ChatCompletion.parse_obj(
         {
             "id": "chatcmpl-7qyuw6Q1CFCpcKsMdFkmUPUa7JP2x",
             "object": "chat.completion",
@@ -31,11 +32,14 @@ _openai_chat_completion_responses = [
             "usage": {"completion_tokens": 9, "prompt_tokens": 10, "total_tokens": 19},
         }
     )
-    for text in [
-        "YES",
-        "NO",
-        "YES",
-    ]
+
+
+# single batched response covering all documents in one call
+_batched_responses = [_make_completion("1: YES\n2: NO\n3: YES")]
+
+# unparsable batched response, then one response per document (fallback path)
+_fallback_responses = [
+    _make_completion(text) for text in ["garbage", "YES", "NO", "YES"]
 ]
 
 
@@ -51,9 +55,23 @@ def llm():
 
 @patch(
     "openai.resources.chat.completions.Completions.create",
-    side_effect=_openai_chat_completion_responses,
+    side_effect=_batched_responses,
+)
+def test_reranking_batched(openai_completion, llm):
+    documents = [Document(text=f"test {idx}") for idx in range(3)]
+    query = "test query"
+
+    reranker = LLMReranking(llm=llm, concurrent=False)
+    rerank_docs = reranker(documents, query=query)
+
+    assert len(rerank_docs) == 2
+
+
+@patch(
+    "openai.resources.chat.completions.Completions.create",
+    side_effect=_fallback_responses,
 )
-def test_reranking(openai_completion, llm):
+def test_reranking_fallback_per_doc(openai_completion, llm):
     documents = [Document(text=f"test {idx}") for idx in range(3)]
     query = "test query"
 